@@ -23,8 +23,9 @@ def main():
     
     # Save normalized data
     output_file = output_dir / "vendor_data.json"
-    with open(output_file, "w") as f:
-        json.dump([data.dict() for data in vendor_data], f, indent=2)
+    payload = json.dumps([data.dict() for data in vendor_data], separators=(",", ":"))
+    with open(output_file, "wb", buffering=1 << 20) as f:
+        f.write(payload.encode("utf-8"))
     
     print(f"Data collected and saved to {output_file}")
 
@@ -9,29 +9,40 @@ File: src/gui/zip_input_app.py
 
 import os
 import sys
+import asyncio
 import logging
 import tkinter as tk
+from collections import deque
+from threading import Thread
 from tkinter import ttk, scrolledtext, messagebox
-from typing import List, Dict, Optional, Tuple
+from typing import Deque, List, Dict, Optional, Tuple
 from pathlib import Path
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(Path("logs") / "app.log"),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Ensure the logs directory exists before the file handler needs it
+os.makedirs(Path("logs"), exist_ok=True)
+
+# Configure logging, unless the application importing this module already has
+if not logging.getLogger().handlers:
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(Path("logs") / "app.log", delay=True),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
 logger = logging.getLogger(__name__)
 
-# Ensure the logs directory exists
-os.makedirs(Path("logs"), exist_ok=True)
+# Initial size of the main window
+WINDOW_WIDTH = 800
+WINDOW_HEIGHT = 600
+
+# How often queued log messages are written to the output log
+LOG_FLUSH_INTERVAL_MS = 100
 
 # Import our custom modules
 try:
-    from src.vendor_intake.utils.zip_state_mapper import ZipCodeMapper
+    from src.vendor_intake.utils.zip_state_mapper import get_zip_mapper
     # These will be imported later as we develop them
     # from src.scrapers.crawl4ai_integration.potadvisor_crawler import PotAdvisorCrawler
 except ImportError as e:
@@ -50,10 +61,10 @@ class ZipCodeInputApp:
         """
         self.root = root
         self.root.title("Loot's Ganja Guide - Data Collection")
-        self.root.geometry("800x600")
+        self.root.geometry(f"{WINDOW_WIDTH}x{WINDOW_HEIGHT}")
         
         # Set up the ZIP code mapper
-        self.zip_mapper = ZipCodeMapper()
+        self.zip_mapper = get_zip_mapper()
         
         # Create and set up widgets
         self.create_widgets()
@@ -64,16 +75,29 @@ class ZipCodeInputApp:
         # Job tracking
         self.current_jobs = {}
         
+        # Background event loop that runs every crawl, reused across runs
+        self._loop = asyncio.new_event_loop()
+        Thread(target=self._loop.run_forever, daemon=True).start()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Log messages may come from the crawler thread, so they are queued
+        # and written to the output log in batches on the Tk thread
+        self._log_queue: Deque[str] = deque()
+        self.root.after(LOG_FLUSH_INTERVAL_MS, self._flush_logs)
+        
         logger.info("Application initialized")
     
+    def on_close(self) -> None:
+        """Stop the background event loop and close the application window."""
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self.root.destroy()
+    
     def center_window(self) -> None:
         """Center the application window on the screen."""
-        self.root.update_idletasks()
-        width = self.root.winfo_width()
-        height = self.root.winfo_height()
-        x = (self.root.winfo_screenwidth() // 2) - (width // 2)
-        y = (self.root.winfo_screenheight() // 2) - (height // 2)
-        self.root.geometry(f'{width}x{height}+{x}+{y}')
+        # The window size is known up front, so no layout pass is needed to measure it
+        x = (self.root.winfo_screenwidth() // 2) - (WINDOW_WIDTH // 2)
+        y = (self.root.winfo_screenheight() // 2) - (WINDOW_HEIGHT // 2)
+        self.root.geometry(f'{WINDOW_WIDTH}x{WINDOW_HEIGHT}+{x}+{y}')
     
     def create_widgets(self) -> None:
         """Create and configure all GUI widgets."""
@@ -168,12 +192,23 @@ class ZipCodeInputApp:
         Args:
             message: The message to add to the log
         """
-        self.output_log.config(state=tk.NORMAL)
-        self.output_log.insert(tk.END, message + "\n")
-        self.output_log.see(tk.END)
-        self.output_log.config(state=tk.DISABLED)
+        self._log_queue.append(message + "\n")
         logger.info(message)
     
+    def _flush_logs(self) -> None:
+        """Write all queued log messages to the output log and schedule the next flush."""
+        if self._log_queue:
+            lines = []
+            while self._log_queue:
+                lines.append(self._log_queue.popleft())
+            
+            self.output_log.config(state=tk.NORMAL)
+            self.output_log.insert(tk.END, "".join(lines))
+            self.output_log.see(tk.END)
+            self.output_log.config(state=tk.DISABLED)
+        
+        self.root.after(LOG_FLUSH_INTERVAL_MS, self._flush_logs)
+    
     def set_status(self, message: str) -> None:
         """
         Update the status bar text.
@@ -182,7 +217,6 @@ class ZipCodeInputApp:
             message: The new status message
         """
         self.status_var.set(message)
-        self.root.update_idletasks()
     
     def run_data_collection(self) -> None:
         """Process the entered ZIP codes and initiate data collection."""
@@ -214,7 +248,7 @@ class ZipCodeInputApp:
                 self.log_message(f"State {state}: {len(zips)} ZIP codes")
             
             # Generate PotAdvisor URLs
-            urls = self.zip_mapper.states_to_urls(set(state_groups.keys()))
+            urls = self.zip_mapper.states_to_urls(state_groups.keys())
             
             for state, url in urls.items():
                 self.log_message(f"Generated URL for {state}: {url}")
@@ -289,18 +323,8 @@ class ZipCodeInputApp:
             # Import crawler to check if it exists
             from src.scrapers.crawl4ai_integration.potadvisor_crawler import PotAdvisorCrawler
             
-            # Run the async crawler in a non-blocking way
-            import asyncio
-            from threading import Thread
-            
-            def run_async_crawler():
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                loop.run_until_complete(self.run_crawler(urls, state_groups))
-                loop.close()
-            
-            # Start crawler in a separate thread
-            Thread(target=run_async_crawler, daemon=True).start()
+            # Run the async crawler on the background event loop
+            asyncio.run_coroutine_threadsafe(self.run_crawler(urls, state_groups), self._loop)
             
         except ImportError:
             # Fall back to simulation if crawler not implemented
@@ -8,137 +8,494 @@ File: src/scrapers/crawl4ai_integration/potadvisor_crawler.py
 """
 
 import asyncio
+import contextlib
+import functools
+import hashlib
 import json
 import logging
 import os
+import re
+import threading
+import time
+import weakref
 from pathlib import Path
-from typing import Dict, List, Tuple, Set, Any, Optional
+from types import SimpleNamespace
+from typing import AbstractSet, Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit, urlunsplit
 
 from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
 
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library if orjson is unavailable
+    orjson = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is only available with pyarrow installed
+    pa = None
+    pq = None
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Buffer size for output files, so writes reach the OS in large chunks
+_WRITE_BUFFER_SIZE = 1 << 20
+
+# Schema for extracting dispensary listings from state pages
+_LISTING_SCHEMA: Dict[str, Any] = {
+    "name": "PotAdvisor State Listings",
+    "baseSelector": ".article, article, .dispensary, div[class*='dispensary']",  # More flexible to match various structures
+    "fields": [
+        {
+            "name": "name",
+            "selector": "h2, h3, .title, .heading, [class*='title'], [class*='name']",  # More flexible for titles
+            "type": "text"
+        },
+        {
+            "name": "address",
+            "selector": "*:contains('Address:'), span[class*='address'], div[class*='address'], div:contains('Anchor')",  # More flexible for addresses
+            "type": "text"
+        },
+        {
+            "name": "url",
+            "selector": "a[href*='directory'], a.button, a[class*='btn'], a[class*='link'], a:not([class])",  # More flexible for links
+            "type": "attribute",
+            "attribute": "href"
+        }
+    ]
+}
+
+# Schema for extracting detailed dispensary information
+_DETAIL_SCHEMA: Dict[str, Any] = {
+    "name": "PotAdvisor Dispensary Details",
+    "fields": [
+        {
+            "name": "name",
+            "selector": "h1, h2, .title, [class*='title'], [class*='heading']",  # More flexible title matching
+            "type": "text"
+        },
+        {
+            "name": "address",
+            "selector": "*:contains('Address:'), *[class*='address']",  # More flexible address matching
+            "type": "text"
+        },
+        {
+            "name": "phone",
+            "selector": "*:contains('Phone:'), a[href^='tel:'], *[class*='phone']",  # More flexible phone matching
+            "type": "text"
+        },
+        {
+            "name": "website",
+            "selector": "*:contains('Website:') a, a[href^='http'], a[class*='website'], a[class*='external']",  # More flexible website link matching
+            "type": "attribute",
+            "attribute": "href"
+        },
+        {
+            "name": "hours",
+            "selector": "*:contains('Hours:'), *[class*='hours'], *:contains('Open')",  # Fixed syntax error
+            "type": "text"
+        },
+        {
+            "name": "type",
+            "selector": "*:contains('Type:'), *[class*='type'], span:contains('Recreational'), span:contains('Medical')",  # More flexible type matching
+            "type": "text"
+        }
+    ]
+}
+
+# Cache keys include the schemas, so editing a schema invalidates pages extracted with the old one
+_SCHEMA_FINGERPRINT = hashlib.sha1(
+    json.dumps([_LISTING_SCHEMA, _DETAIL_SCHEMA], sort_keys=True).encode('utf-8')
+).hexdigest()[:12]
+
+# Columns written by the Parquet export, in order
+_DISPENSARY_FIELDS = ("name", "address", "phone", "website", "hours", "type", "zip_code", "url")
+
+# ZIP code pattern (5 digits, optionally followed by hyphen and 4 digits)
+_ZIP_RE = re.compile(r'\b(\d{5}(?:-\d{4})?)\b')
+
+# Characters that may precede a ZIP code at the end of an address
+_ZIP_SEPARATORS = frozenset(" ,")
+
+
+def _is_ascii_digits(text: str) -> bool:
+    """Check that a string consists only of ASCII digits."""
+    return text.isdigit() and text.isascii()
+
+
+def _extract_zip(address: str) -> Optional[str]:
+    """
+    Extract a ZIP code from an address string.
+    
+    Addresses usually end in "ST 99501" or "ST 99501-1234", so the end of the
+    string is checked with slices first and the regex only runs when that fails.
+    """
+    tail = address.rstrip()
+    length = len(tail)
+    
+    # Trailing 5-digit ZIP
+    if length >= 5 and _is_ascii_digits(tail[-5:]) and (length == 5 or tail[-6] in _ZIP_SEPARATORS):
+        return tail[-5:]
+    
+    # Trailing ZIP+4
+    if (length >= 10 and tail[-5] == '-' and _is_ascii_digits(tail[-4:]) and _is_ascii_digits(tail[-10:-5])
+            and (length == 10 or tail[-11] in _ZIP_SEPARATORS)):
+        return tail[-10:]
+    
+    zip_match = _ZIP_RE.search(address)
+    
+    if zip_match:
+        return zip_match.group(1)
+    return None
+
+
+def _normalize_url(url: str) -> str:
+    """Canonicalize a URL for deduplication: lowercase host, drop fragment and trailing slash."""
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip('/'), parts.query, ''))
+
+
+def _json_loads(data: Any) -> Any:
+    """Parse JSON from a str or bytes payload, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj: Any, pretty: bool = False) -> bytes:
+    """Serialize an object to UTF-8 encoded JSON, using orjson when available."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def _write_file(path: str, data: bytes) -> None:
+    """Write bytes to a file through a large buffer."""
+    with open(path, 'wb', buffering=_WRITE_BUFFER_SIZE) as f:
+        f.write(data)
+
+
+def _write_file_atomic(path: str, data: bytes) -> None:
+    """Write bytes to a temporary file and move it into place, so readers never see a partial file."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        _write_file(tmp_path, data)
+        os.replace(tmp_path, path)
+    except OSError:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+
+def ndjson_to_json(ndjson_file: str, json_file: Optional[str] = None, pretty: bool = False) -> str:
+    """
+    Convert a newline-delimited JSON file written by the crawler into a JSON array file.
+    
+    Args:
+        ndjson_file: Path of the NDJSON file to convert
+        json_file: Path of the JSON file to write; defaults to ndjson_file with a .json suffix
+        pretty: Indent the output JSON
+        
+    Returns:
+        Path of the written JSON file
+    """
+    if json_file is None:
+        json_file = str(Path(ndjson_file).with_suffix('.json'))
+    
+    with open(ndjson_file, 'rb') as f:
+        records = [_json_loads(line) for line in f if line.strip()]
+    
+    _write_file(json_file, _json_dumps(records, pretty=pretty))
+    return json_file
+
+
+class _JsonCollector:
+    """Collect records in listing order and write them as one JSON array."""
+    
+    suffix = '.json'
+    
+    def __init__(self, pretty: bool = False):
+        self.pretty = pretty
+        self._records: Dict[int, Dict[str, Any]] = {}
+    
+    @property
+    def count(self) -> int:
+        """Number of records collected so far."""
+        return len(self._records)
+    
+    @property
+    def records(self) -> List[Dict[str, Any]]:
+        """Collected records, ordered by their position in the listing."""
+        return [self._records[index] for index in sorted(self._records)]
+    
+    async def write(self, index: int, record: Dict[str, Any]) -> None:
+        """Store a record under its listing position."""
+        self._records[index] = record
+    
+    def finish(self, path: str) -> None:
+        """Serialize the records in memory and write them in a single call."""
+        _write_file(path, _json_dumps(self.records, pretty=self.pretty))
+    
+    def close(self) -> None:
+        """Nothing to release; records only live in memory."""
+
+
+class _NdjsonWriter:
+    """Append records to a newline-delimited JSON file, writing from worker threads."""
+    
+    suffix = '.ndjson'
+    
+    def __init__(self, output_dir: str):
+        self.count = 0
+        # Stream into a temporary file that finish() moves into place. It is opened like the
+        # other outputs, not with mkstemp, so its permissions follow the umask
+        self._tmp_path = os.path.join(output_dir, f".{os.getpid()}.{id(self)}.ndjson.tmp")
+        self._file = open(self._tmp_path, 'xb', buffering=_WRITE_BUFFER_SIZE)
+    
+    async def write(self, index: int, record: Dict[str, Any]) -> None:
+        """Serialize a record and append it as one line without blocking the event loop."""
+        line = _json_dumps(record) + b"\n"
+        await asyncio.get_running_loop().run_in_executor(None, self._file.write, line)
+        self.count += 1
+    
+    def finish(self, path: str) -> None:
+        """Flush the streamed records and move the file to its final path."""
+        self._file.close()
+        os.replace(self._tmp_path, path)
+    
+    def close(self) -> None:
+        """Close the file and remove it unless finish() already moved it into place."""
+        self._file.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._tmp_path)
+
+
+class _ColumnBuffer:
+    """Stage records column by column for a columnar Parquet export."""
+    
+    suffix = '.parquet'
+    
+    def __init__(self):
+        self.columns: Dict[str, List[Any]] = {field: [] for field in _DISPENSARY_FIELDS}
+        self.count = 0
+    
+    async def write(self, index: int, record: Dict[str, Any]) -> None:
+        """Append a record's fields to their columns."""
+        for field, column in self.columns.items():
+            column.append(record.get(field))
+        self.count += 1
+    
+    def finish(self, path: str) -> None:
+        """Write the staged columns to a Parquet file."""
+        pq.write_table(pa.Table.from_pydict(self.columns), path)
+    
+    def close(self) -> None:
+        """Nothing to release; columns only live in memory."""
+
+
 class PotAdvisorCrawler:
     """
     Class for crawling PotAdvisor websites to extract dispensary information
     and filter results by provided ZIP codes.
     """
     
-    def __init__(self, output_dir: str = "output/normalized"):
+    def __init__(self, output_dir: str = "output/normalized", max_concurrency: int = 5,
+                 detail_concurrency: int = 10, max_requests: int = 50, per_domain_delay: float = 0.0,
+                 pretty_json: bool = False, stream_ndjson: bool = False, export_parquet: bool = False,
+                 cache_dir: Optional[str] = "output/cache", cache_ttl: float = 24 * 60 * 60):
         """
         Initialize the PotAdvisor crawler.
         
         Args:
             output_dir: Directory where results will be saved
+            max_concurrency: Maximum number of states crawled at the same time
+            detail_concurrency: Maximum number of detail pages crawled at the same time per state
+            max_requests: Maximum number of page requests in flight across all states
+            per_domain_delay: Minimum seconds between the start of two requests to the same domain
+            pretty_json: Indent output files for debugging instead of writing compact JSON
+            stream_ndjson: Write each dispensary to a newline-delimited JSON file as soon as it
+                           is crawled instead of collecting a state's results into one JSON array
+            export_parquet: Stage results in columns and write one Parquet file per state
+                            instead of JSON (requires pyarrow)
+            cache_dir: Directory for the on-disk page cache, or None to disable it and
+                       use crawl4ai's own (non-expiring) cache instead
+            cache_ttl: Seconds a cached page stays fresh
         """
         self.output_dir = output_dir
+        self.max_concurrency = max_concurrency
+        self.detail_concurrency = detail_concurrency
+        self.max_requests = max_requests
+        self.per_domain_delay = per_domain_delay
+        self.pretty_json = pretty_json
+        self.stream_ndjson = stream_ndjson
+        self.export_parquet = export_parquet
+        self.cache_dir = cache_dir
+        self.cache_ttl = cache_ttl
+        
+        # Global request limit and per-domain request spacing. asyncio primitives bind to the
+        # loop that first waits on them, so each event loop gets its own semaphore and locks
+        self._loop_throttles: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._domain_last_hit: Dict[str, float] = {}
+        
+        if stream_ndjson and export_parquet:
+            raise ValueError("stream_ndjson and export_parquet cannot both be enabled")
+        if export_parquet and pa is None:
+            raise ImportError("pyarrow is required for export_parquet")
+        
+        # Pick once how each state's dispensaries are collected and saved
+        if stream_ndjson:
+            self._new_sink: Callable[[], Any] = functools.partial(_NdjsonWriter, output_dir)
+        elif export_parquet:
+            self._new_sink = _ColumnBuffer
+        else:
+            self._new_sink = functools.partial(_JsonCollector, pretty_json)
         
-        # Create output directory if it doesn't exist
+        # Create output and cache directories if they don't exist
         os.makedirs(Path(output_dir), exist_ok=True)
+        if cache_dir is not None:
+            os.makedirs(Path(cache_dir), exist_ok=True)
         
         # Define extraction schemas
-        self.listing_schema = self._define_listing_schema()
-        self.detail_schema = self._define_detail_schema()
+        self.listing_schema = _LISTING_SCHEMA
+        self.detail_schema = _DETAIL_SCHEMA
+        
+        # With the on-disk page cache enabled it alone decides freshness, so misses must
+        # reach the network instead of crawl4ai's own cache, whose entries never expire
+        cache_mode = CacheMode.BYPASS if cache_dir is not None else CacheMode.ENABLED
+
+        # Browser, extraction strategies and run configs are reused for every crawl
+        self._browser_config = BrowserConfig(
+            headless=True,
+            verbose=False
+        )
+        self._listing_config = CrawlerRunConfig(
+            extraction_strategy=JsonCssExtractionStrategy(self.listing_schema),
+            cache_mode=cache_mode
+        )
+        self._detail_config = CrawlerRunConfig(
+            extraction_strategy=JsonCssExtractionStrategy(self.detail_schema),
+            cache_mode=cache_mode
+        )
         
         logger.info("PotAdvisor crawler initialized with output directory: %s", output_dir)
     
-    def _define_listing_schema(self) -> Dict[str, Any]:
+    def extract_zip_from_address(self, address: str) -> Optional[str]:
         """
-        Define the schema for extracting dispensary listings from state pages.
+        Extract ZIP code from an address string.
         
+        Args:
+            address: Address string to extract ZIP code from
+            
         Returns:
-            Dictionary defining the extraction schema for listings
+            ZIP code string or None if not found
         """
-        return {
-            "name": "PotAdvisor State Listings",
-            "baseSelector": ".article, article, .dispensary, div[class*='dispensary']",  # More flexible to match various structures
-            "fields": [
-                {
-                    "name": "name",
-                    "selector": "h2, h3, .title, .heading, [class*='title'], [class*='name']",  # More flexible for titles
-                    "type": "text"
-                },
-                {
-                    "name": "address",
-                    "selector": "*:contains('Address:'), span[class*='address'], div[class*='address'], div:contains('Anchor')",  # More flexible for addresses
-                    "type": "text"
-                },
-                {
-                    "name": "url",
-                    "selector": "a[href*='directory'], a.button, a[class*='btn'], a[class*='link'], a:not([class])",  # More flexible for links
-                    "type": "attribute",
-                    "attribute": "href"
-                }
-            ]
-        }
+        return _extract_zip(address)
     
-    def _define_detail_schema(self) -> Dict[str, Any]:
+    async def _throttled_arun(self, crawler: AsyncWebCrawler, url: str, config: CrawlerRunConfig) -> Any:
         """
-        Define the schema for extracting detailed dispensary information.
+        Crawl a URL within the global request limit, starting requests to the same
+        domain at least per_domain_delay seconds apart.
         
+        Args:
+            crawler: Started crawler to use
+            url: URL to crawl
+            config: Run configuration for the crawl
+            
         Returns:
-            Dictionary defining the extraction schema for details
+            Crawl result
         """
-        return {
-            "name": "PotAdvisor Dispensary Details",
-            "fields": [
-                {
-                    "name": "name",
-                    "selector": "h1, h2, .title, [class*='title'], [class*='heading']",  # More flexible title matching
-                    "type": "text"
-                },
-                {
-                    "name": "address",
-                    "selector": "*:contains('Address:'), *[class*='address']",  # More flexible address matching
-                    "type": "text"
-                },
-                {
-                    "name": "phone",
-                    "selector": "*:contains('Phone:'), a[href^='tel:'], *[class*='phone']",  # More flexible phone matching
-                    "type": "text"
-                },
-                {
-                    "name": "website",
-                    "selector": "*:contains('Website:') a, a[href^='http'], a[class*='website'], a[class*='external']",  # More flexible website link matching
-                    "type": "attribute",
-                    "attribute": "href"
-                },
-                {
-                    "name": "hours",
-                    "selector": "*:contains('Hours:'), *[class*='hours'], *:contains('Open')",  # Fixed syntax error
-                    "type": "text"
-                },
-                {
-                    "name": "type",
-                    "selector": "*:contains('Type:'), *[class*='type'], span:contains('Recreational'), span:contains('Medical')",  # More flexible type matching
-                    "type": "text"
-                }
-            ]
-        }
+        loop = asyncio.get_running_loop()
+        throttle = self._loop_throttles.get(loop)
+        if throttle is None:
+            throttle = self._loop_throttles[loop] = (asyncio.Semaphore(self.max_requests), {})
+        request_semaphore, domain_locks = throttle
+        
+        # Take a request slot first, so the reserved start time is when the request
+        # actually starts rather than when it began waiting for a slot
+        async with request_semaphore:
+            if self.per_domain_delay > 0:
+                host = urlsplit(url).netloc.lower()
+                lock = domain_locks.setdefault(host, asyncio.Lock())
+                
+                # Only reserving the start time is serialized; the fetches themselves overlap
+                async with lock:
+                    wait = self._domain_last_hit.get(host, 0.0) + self.per_domain_delay - time.monotonic()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    self._domain_last_hit[host] = time.monotonic()
+            
+            return await crawler.arun(url=url, config=config)
     
-    def extract_zip_from_address(self, address: str) -> Optional[str]:
+    async def _cached_arun(self, crawler: AsyncWebCrawler, url: str, config: CrawlerRunConfig,
+                           key_prefix: str) -> Tuple[Any, Any]:
         """
-        Extract ZIP code from an address string.
+        Crawl a URL and parse its extracted JSON, serving the content from the on-disk
+        cache when fresh.
         
         Args:
-            address: Address string to extract ZIP code from
+            crawler: Started crawler to use on a cache miss
+            url: URL to crawl
+            config: Run configuration for the crawl
+            key_prefix: Prefix separating cache entries of different page types
             
         Returns:
-            ZIP code string or None if not found
+            Tuple of (crawl result, parsed content). On a cache hit the result is a stand-in
+            exposing success, extracted_content and error. If the crawl fails or its content
+            is not valid JSON, success is False and the parsed content is None.
         """
-        import re
+        cache_file = None
+        
+        if self.cache_dir is not None:
+            key = hashlib.sha1(f"{_SCHEMA_FINGERPRINT}:{url}".encode('utf-8')).hexdigest()
+            cache_file = Path(self.cache_dir) / f"{key_prefix}_{key}.json"
+            
+            try:
+                if time.time() - cache_file.stat().st_mtime < self.cache_ttl:
+                    content = cache_file.read_bytes()
+                    try:
+                        data = _json_loads(content)
+                    except json.JSONDecodeError:
+                        # Never serve a corrupt entry; drop it and crawl the page again
+                        logger.warning(f"Discarding corrupt cache entry for {url}")
+                        cache_file.unlink(missing_ok=True)
+                    else:
+                        return SimpleNamespace(success=True, extracted_content=content, error=None), data
+            except FileNotFoundError:
+                pass
+        
+        result = await self._throttled_arun(crawler, url, config)
+        
+        if not result.success:
+            return result, None
+        
+        try:
+            data = _json_loads(result.extracted_content)
+        except json.JSONDecodeError:
+            error = f"Failed to parse JSON from extracted content. Content: {result.extracted_content[:100]}..."
+            return SimpleNamespace(success=False, extracted_content=result.extracted_content, error=error), None
         
-        # Look for ZIP code pattern (5 digits, optionally followed by hyphen and 4 digits)
-        zip_match = re.search(r'\b(\d{5}(?:-\d{4})?)\b', address)
+        if cache_file is not None:
+            try:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, _write_file_atomic, str(cache_file), result.extracted_content.encode('utf-8')
+                )
+            except OSError as e:
+                logger.warning(f"Failed to cache {url}: {str(e)}")
         
-        if zip_match:
-            return zip_match.group(1)
-        return None
+        return result, data
     
     async def crawl_state(self, state_abbr: str, state_name: str, url: str, 
-                         filter_zip_codes: Set[str]) -> List[Dict[str, Any]]:
+                         filter_zip_codes: AbstractSet[str], crawler: AsyncWebCrawler,
+                         sink: Optional[Callable[[int, Dict[str, Any]], Awaitable[None]]] = None) -> List[Dict[str, Any]]:
         """
         Crawl PotAdvisor for a specific state and extract dispensary information,
         filtering by the provided ZIP codes.
@@ -148,106 +505,106 @@ class PotAdvisorCrawler:
             state_name: State name (e.g., 'alaska')
             url: PotAdvisor URL for the state listings
             filter_zip_codes: Set of ZIP codes to filter by
+            crawler: Started crawler shared across states
+            sink: Optional coroutine receiving each dispensary, with its position in the
+                  filtered listing, as soon as its details are merged
             
         Returns:
-            List of dispensary data dictionaries
+            List of dispensary data dictionaries, or an empty list when a sink is given
         """
         logger.info(f"Starting crawl for {state_name.title()} ({state_abbr})")
         
-        # Configure the browser
-        browser_config = BrowserConfig(
-            headless=True,
-            verbose=False
-        )
-        
-        # Set up extraction strategy for state listing page
-        listing_strategy = JsonCssExtractionStrategy(self.listing_schema)
-        
-        # Configure crawler for state listing
-        run_config = CrawlerRunConfig(
-            extraction_strategy=listing_strategy,
-            cache_mode=CacheMode.ENABLED
-        )
-        
-        dispensaries = []
+        dispensaries: List[Dict[str, Any]] = []
         
         try:
             # Perform initial crawl to get dispensary listings
-            async with AsyncWebCrawler(config=browser_config) as crawler:
-                logger.info(f"Crawling state listing: {url}")
+            logger.info(f"Crawling state listing: {url}")
+            
+            result, listings = await self._cached_arun(crawler, url, self._listing_config, "listing")
+            
+            if result.success:
+                logger.info(f"Found {len(listings)} dispensaries in {state_name.title()}")
                 
-                result = await crawler.arun(
-                    url=url,
-                    config=run_config
-                )
+                # Filter by ZIP code
+                filtered_listings = []
+                no_filter = not filter_zip_codes
                 
-                if result.success:
-                    # Parse the extracted content
-                    try:
-                        listings = json.loads(result.extracted_content)
-                        logger.info(f"Found {len(listings)} dispensaries in {state_name.title()}")
-                        
-                        # Filter by ZIP code
-                        filtered_listings = []
-                        
-                        for listing in listings:
-                            # Extract ZIP code from address
-                            address = listing.get('address', '')
-                            zip_code = self.extract_zip_from_address(address)
-                            if zip_code:
-                                listing['zip_code'] = zip_code
-                            
-                            # Include dispensaries with matching ZIP codes or if no filter is applied
-                            if not filter_zip_codes or (zip_code and zip_code in filter_zip_codes):
-                                filtered_listings.append(listing)
-                        
-                        logger.info(f"Filtered to {len(filtered_listings)} dispensaries in specified ZIP codes")
-                        
-                        # Crawl detailed pages for each filtered dispensary
-                        detail_strategy = JsonCssExtractionStrategy(self.detail_schema)
-                        detail_config = CrawlerRunConfig(
-                            extraction_strategy=detail_strategy,
-                            cache_mode=CacheMode.ENABLED
-                        )
+                for listing in listings:
+                    # Extract ZIP code from address
+                    address = listing.get('address', '')
+                    zip_code = self.extract_zip_from_address(address)
+                    if zip_code:
+                        listing['zip_code'] = zip_code
+                    
+                    # Include dispensaries with matching ZIP codes or if no filter is applied
+                    if no_filter or (zip_code and zip_code in filter_zip_codes):
+                        filtered_listings.append(listing)
+                
+                logger.info(f"Filtered to {len(filtered_listings)} dispensaries in specified ZIP codes")
+                
+                # Without a sink, records are collected and returned in listing order
+                collector = _JsonCollector() if sink is None else None
+                emit = sink if sink is not None else collector.write
+                
+                # Group listings by detail page so each unique URL is crawled once
+                detail_urls: Dict[str, Tuple[str, List[int]]] = {}
+                
+                for index, listing in enumerate(filtered_listings):
+                    # Get dispensary detail URL
+                    detail_url = listing.get('url')
+                    
+                    if not detail_url:
+                        logger.warning(f"No URL for dispensary: {listing.get('name')}")
+                        await emit(index, listing)
+                        continue
+                    
+                    # Resolve relative URLs against the listing page they were found on
+                    detail_url = urljoin(url, detail_url)
+                    
+                    key = _normalize_url(detail_url)
+                    detail_urls.setdefault(key, (detail_url, []))[1].append(index)
+                
+                # Crawl detailed pages for each unique dispensary URL
+                semaphore = asyncio.Semaphore(self.detail_concurrency)
+                
+                async def fetch_detail(detail_url: str, indices: List[int]) -> None:
+                    name = filtered_listings[indices[0]].get('name')
+                    # Fall back to the bare listings unless the details can be merged
+                    records = [filtered_listings[index] for index in indices]
+                    
+                    async with semaphore:
+                        logger.info(f"Crawling details for: {name} - {detail_url}")
                         
-                        for listing in filtered_listings:
-                            # Get dispensary detail URL
-                            detail_url = listing.get('url')
+                        try:
+                            detail_result, detail_data = await self._cached_arun(
+                                crawler, detail_url, self._detail_config, "detail"
+                            )
                             
-                            if detail_url:
-                                # Handle relative URLs
-                                if not detail_url.startswith('http'):
-                                    detail_url = f"https://potadvisor.com{detail_url}"
-                                
-                                logger.info(f"Crawling details for: {listing.get('name')} - {detail_url}")
-                                
-                                try:
-                                    detail_result = await crawler.arun(
-                                        url=detail_url,
-                                        config=detail_config
-                                    )
-                                    
-                                    if detail_result.success:
-                                        # Parse detailed information
-                                        detail_data = json.loads(detail_result.extracted_content)
-                                        # Merge listing and detail data
-                                        merged_data = {**listing}
-                                        if detail_data and len(detail_data) > 0:
-                                            merged_data.update(detail_data[0])
-                                        dispensaries.append(merged_data)
-                                    else:
-                                        logger.warning(f"Failed to get details for {listing.get('name')}: {detail_result.error}")
-                                        dispensaries.append(listing)  # Add listing data without details
-                                except Exception as e:
-                                    logger.error(f"Error crawling details for {listing.get('name')}: {str(e)}")
-                                    dispensaries.append(listing)  # Add listing data without details
+                            if detail_result.success:
+                                detail = detail_data[0] if detail_data else {}
+                                # Merge listing and detail data for every listing sharing this page
+                                records = [{**listing, **detail} for listing in records]
                             else:
-                                logger.warning(f"No URL for dispensary: {listing.get('name')}")
-                                dispensaries.append(listing)
-                    except json.JSONDecodeError:
-                        logger.error(f"Failed to parse JSON from extracted content. Content: {result.extracted_content[:100]}...")
-                else:
-                    logger.error(f"Failed to crawl state listing: {result.error}")
+                                logger.warning(f"Failed to get details for {name}: {detail_result.error}")
+                        except Exception as e:
+                            logger.error(f"Error crawling details for {name}: {str(e)}")
+                    
+                    for index, record in zip(indices, records):
+                        await emit(index, record)
+                
+                # Let every detail task finish before the sink is handed back, even if one fails
+                results = await asyncio.gather(
+                    *(fetch_detail(detail_url, indices) for detail_url, indices in detail_urls.values()),
+                    return_exceptions=True
+                )
+                for error in results:
+                    if isinstance(error, BaseException):
+                        raise error
+                
+                if collector is not None:
+                    dispensaries = collector.records
+            else:
+                logger.error(f"Failed to crawl state listing: {result.error}")
         except Exception as e:
             logger.exception(f"Error during crawling: {str(e)}")
         
@@ -266,34 +623,59 @@ class PotAdvisorCrawler:
             Dictionary mapping state abbreviations to output file paths
         """
         output_files = {}
+        states = list(state_mapping.items())
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        loop = asyncio.get_running_loop()
         
-        for state_abbr, (url, state_name) in state_mapping.items():
+        async def crawl_one(crawler: AsyncWebCrawler, state_abbr: str, url: str,
+                            state_name: str) -> Optional[str]:
             # Get filter ZIP codes for this state
-            filter_zip_codes = set(filter_zips_by_state.get(state_abbr, []))
-            
-            # Crawl the state
-            dispensaries = await self.crawl_state(
-                state_abbr=state_abbr,
-                state_name=state_name,
-                url=url,
-                filter_zip_codes=filter_zip_codes
-            )
+            filter_zip_codes = frozenset(filter_zips_by_state.get(state_abbr, ()))
+            sink = self._new_sink()
             
-            if dispensaries:
+            try:
+                async with semaphore:
+                    # Crawl the state, handing each dispensary to the sink
+                    await self.crawl_state(
+                        state_abbr=state_abbr,
+                        state_name=state_name,
+                        url=url,
+                        filter_zip_codes=filter_zip_codes,
+                        crawler=crawler,
+                        sink=sink.write
+                    )
+                
+                if not sink.count:
+                    logger.warning(f"No dispensaries found for {state_name}")
+                    return None
+                
                 # Create output file path
-                output_file = os.path.join(self.output_dir, f"{state_name.lower()}_dispensaries.json")
+                output_file = os.path.join(self.output_dir, f"{state_name.lower()}_dispensaries{sink.suffix}")
                 
-                # Save results to JSON file
+                # Save results in a worker thread while other states keep crawling
                 try:
-                    with open(output_file, 'w', encoding='utf-8') as f:
-                        json.dump(dispensaries, f, indent=2, ensure_ascii=False)
-                    
-                    logger.info(f"Saved {len(dispensaries)} dispensaries to {output_file}")
-                    output_files[state_abbr] = output_file
+                    await loop.run_in_executor(None, sink.finish, output_file)
                 except Exception as e:
                     logger.error(f"Error saving results for {state_name}: {str(e)}")
-            else:
-                logger.warning(f"No dispensaries found for {state_name}")
+                    return None
+            finally:
+                sink.close()
+            
+            logger.info(f"Saved {sink.count} dispensaries to {output_file}")
+            return output_file
+        
+        # Share one browser across all states, crawling them concurrently
+        async with AsyncWebCrawler(config=self._browser_config) as crawler:
+            results = await asyncio.gather(
+                *(crawl_one(crawler, state_abbr, url, state_name) for state_abbr, (url, state_name) in states),
+                return_exceptions=True
+            )
+        
+        for (state_abbr, (url, state_name)), output_file in zip(states, results):
+            if isinstance(output_file, BaseException):
+                logger.error(f"Error crawling {state_name}: {str(output_file)}")
+            elif output_file:
+                output_files[state_abbr] = output_file
         
         return output_files
 
@@ -7,19 +7,241 @@ and perform validation on ZIP code inputs.
 File: src/vendor_intake/utils/zip_state_mapper.py
 """
 
+import array
+import bisect
+import contextlib
 import csv
+import functools
 import re
 import os
 import logging
+import marshal
+import sys
+import types
+from collections import defaultdict
 from pathlib import Path
-from typing import Dict, List, Set, Tuple, Optional, Union
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, Sequence, Tuple, Optional, Union
+
+if TYPE_CHECKING:
+    import numpy as np
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# ZIP code grammar: 5 digits, optionally followed by a dash and 4 digits
+_ZIP_FINDALL = re.compile(r'\b\d{5}(?:-\d{4})?\b')
+_SEP_SPLIT = re.compile(r'[,;\s\n]+')
+
+# State slugs used in PotAdvisor URLs
+_STATE_NAMES = types.MappingProxyType({
+    'AL': 'alabama',
+    'AK': 'alaska',
+    'AZ': 'arizona',
+    'AR': 'arkansas',
+    'CA': 'california',
+    'CO': 'colorado',
+    'CT': 'connecticut',
+    'DE': 'delaware',
+    'FL': 'florida',
+    'GA': 'georgia',
+    'HI': 'hawaii',
+    'ID': 'idaho',
+    'IL': 'illinois',
+    'IN': 'indiana',
+    'IA': 'iowa',
+    'KS': 'kansas',
+    'KY': 'kentucky',
+    'LA': 'louisiana',
+    'ME': 'maine',
+    'MD': 'maryland',
+    'MA': 'massachusetts',
+    'MI': 'michigan',
+    'MN': 'minnesota',
+    'MS': 'mississippi',
+    'MO': 'missouri',
+    'MT': 'montana',
+    'NE': 'nebraska',
+    'NV': 'nevada',
+    'NH': 'new-hampshire',
+    'NJ': 'new-jersey',
+    'NM': 'new-mexico',
+    'NY': 'new-york',
+    'NC': 'north-carolina',
+    'ND': 'north-dakota',
+    'OH': 'ohio',
+    'OK': 'oklahoma',
+    'OR': 'oregon',
+    'PA': 'pennsylvania',
+    'RI': 'rhode-island',
+    'SC': 'south-carolina',
+    'SD': 'south-dakota',
+    'TN': 'tennessee',
+    'TX': 'texas',
+    'UT': 'utah',
+    'VT': 'vermont',
+    'VA': 'virginia',
+    'WA': 'washington',
+    'WV': 'west-virginia',
+    'WI': 'wisconsin',
+    'WY': 'wyoming',
+    'DC': 'district-of-columbia',
+})
+
+_DEFAULT_BASE_URL = "https://potadvisor.com"
+
+def _state_url(base_url: str, state_name: str) -> str:
+    """Build the PotAdvisor dispensary listing URL for a state slug."""
+    # From screenshot we can see the actual URLs are in this format
+    return f"{base_url}/states/{state_name}/{state_name}-dispensaries/"
+
+# (url, state_name) for every state under the default base URL
+_DEFAULT_URLS = types.MappingProxyType({
+    state: (_state_url(_DEFAULT_BASE_URL, state_name), state_name)
+    for state, state_name in _STATE_NAMES.items()
+})
+
+# Canonical state abbreviation strings, so every mapping entry shares one object per state
+_STATE_POOL: Dict[str, str] = {state: sys.intern(state) for state in _STATE_NAMES}
+
+# Fallback ZIP code ranges for states (simplified) as (start, end, state), sorted by start
+_STATE_RANGES: Tuple[Tuple[int, int, str], ...] = (
+    (35000, 36999, 'AL'),
+    (71600, 72999, 'AR'),
+    (85000, 86999, 'AZ'),
+    (98000, 99499, 'WA'),
+    (99500, 99999, 'AK'),
+    # Add more states as needed
+)
+
+# Accepted ZIP database CSV column names, in order of preference
+_ZIP_COLUMNS = ('zip_code', 'zipcode', 'ZIP')
+_STATE_COLUMNS = ('state', 'STATE', 'state_abbr')
+
+# Identifies the parser that built a marshalled ZIP cache; bump the version when _read_zip_csv
+# changes how rows are filtered, so caches built by the old parser are rebuilt
+_ZIP_CACHE_FORMAT = f"1:{','.join(_ZIP_COLUMNS)}:{','.join(_STATE_COLUMNS)}"
+
+# Parallel columns of _STATE_RANGES for bisect lookups
+_RANGE_STARTS = array.array('I', (start for start, _, _ in _STATE_RANGES))
+_RANGE_ENDS = array.array('I', (end for _, end, _ in _STATE_RANGES))
+_RANGE_STATES: Tuple[str, ...] = tuple(state for _, _, state in _STATE_RANGES)
+
+def _read_zip_csv(path: str) -> Dict[str, str]:
+    """
+    Read a ZIP code database CSV into a ZIP to state dict.
+    
+    Args:
+        path: Path to the CSV file
+        
+    Returns:
+        Dict mapping ZIP codes to state abbreviations
+    """
+    with open(path, 'r', newline='', encoding='utf-8') as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader, [])
+        
+        # CSV structure may vary, so find the ZIP and state columns once from the header
+        zip_idx = next((header.index(name) for name in _ZIP_COLUMNS if name in header), None)
+        state_idx = next((header.index(name) for name in _STATE_COLUMNS if name in header), None)
+        if zip_idx is None or state_idx is None:
+            return {}
+        
+        row_len = max(zip_idx, state_idx) + 1
+        # Reuse one string per state value instead of keeping a copy per row
+        state_pool = dict(_STATE_POOL)
+        pooled_state = state_pool.setdefault
+        return {
+            row[zip_idx]: pooled_state(row[state_idx], row[state_idx])
+            for row in reader
+            if len(row) >= row_len and row[zip_idx] and row[state_idx]
+        }
+
+def _read_zip_cache(cache_path: str, mtime: float) -> Optional[Dict[str, str]]:
+    """
+    Load a marshalled ZIP to state dict if it was built from the current CSV by the current parser.
+    
+    Args:
+        cache_path: Path to the cache file
+        mtime: Modification time of the CSV the cache must have been built from
+        
+    Returns:
+        The cached dict, or None if the cache is missing, stale or unreadable
+    """
+    try:
+        with open(cache_path, 'rb') as cache_file:
+            # Reading the whole file first is much faster than marshal.load() on the file object
+            cached = marshal.loads(cache_file.read())
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable ZIP code cache {cache_path}: {str(e)}")
+        return None
+    
+    # The cache stores the parser format and CSV mtime it was built from, so a change to either invalidates it
+    if (isinstance(cached, tuple) and len(cached) == 3 and cached[0] == _ZIP_CACHE_FORMAT
+            and cached[1] == mtime and isinstance(cached[2], dict)):
+        return cached[2]
+    return None
+
+def _write_zip_cache(cache_path: str, mtime: float, zip_to_state: Dict[str, str]) -> None:
+    """
+    Marshal a ZIP to state dict next to its CSV so later processes can skip parsing.
+    
+    Failures are logged and ignored, since the cache is only an optimization.
+    
+    Args:
+        cache_path: Path to the cache file
+        mtime: Modification time of the CSV the dict was built from
+        zip_to_state: Dict mapping ZIP codes to state abbreviations
+    """
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as cache_file:
+            cache_file.write(marshal.dumps((_ZIP_CACHE_FORMAT, mtime, zip_to_state)))
+        # Replace atomically so concurrent readers never see a partial file
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"Could not write ZIP code cache {cache_path}: {str(e)}")
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+
+@functools.lru_cache(maxsize=4)
+def _parse_zip_csv(path: str, mtime: float) -> Mapping[str, str]:
+    """
+    Parse a ZIP code database CSV into a read-only ZIP to state mapping.
+    
+    Results are cached per (path, mtime), so mappers created for the same
+    unchanged file share a single mapping instead of re-parsing it. The parsed
+    dict is also marshalled to "<path>.marshal" together with the CSV mtime and the
+    parser format, and later processes load it instead of the CSV until either changes. marshal only
+    handles plain data, so unlike pickle a cache file cannot run code when loaded.
+    
+    Args:
+        path: Resolved path to the CSV file
+        mtime: Modification time of the file, used to invalidate the cache
+        
+    Returns:
+        Read-only mapping of ZIP codes to state abbreviations
+    """
+    cache_path = f"{path}.marshal"
+    zip_to_state = _read_zip_cache(cache_path, mtime)
+    if zip_to_state is None:
+        zip_to_state = _read_zip_csv(path)
+        _write_zip_cache(cache_path, mtime, zip_to_state)
+    
+    return types.MappingProxyType(zip_to_state)
+
 class ZipCodeMapper:
     """Class for mapping ZIP codes to states and performing related operations."""
     
+    __slots__ = (
+        'zip_to_state_map',
+        'zip_database_path',
+        '_range_starts',
+        '_range_ends',
+        '_range_states',
+    )
+    
     def __init__(self, zip_database_path: Optional[str] = None):
         """
         Initialize the ZIP code mapper with an optional custom database path.
@@ -28,8 +250,14 @@ class ZipCodeMapper:
             zip_database_path: Path to the ZIP code database CSV file. If None, will use a
                                built-in database or attempt to download one.
         """
-        self.zip_to_state_map: Dict[str, str] = {}
+        self.zip_to_state_map: Mapping[str, str] = {}
         self.zip_database_path = zip_database_path
+        
+        # Fallback ZIP ranges as parallel columns sorted by range start
+        self._range_starts = array.array('I')
+        self._range_ends = array.array('I')
+        self._range_states: Tuple[str, ...] = ()
+        
         self._load_zip_database()
     
     def _load_zip_database(self) -> None:
@@ -75,16 +303,9 @@ class ZipCodeMapper:
             file_path: Path to the CSV file containing ZIP code data.
         """
         try:
-            with open(file_path, 'r', newline='', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    # CSV structure may vary, so handle different column names
-                    zip_code = row.get('zip_code') or row.get('zipcode') or row.get('ZIP')
-                    state = row.get('state') or row.get('STATE') or row.get('state_abbr')
-                    
-                    if zip_code and state:
-                        self.zip_to_state_map[zip_code] = state
-                
+            resolved_path = str(Path(file_path).resolve())
+            self.zip_to_state_map = _parse_zip_csv(resolved_path, os.path.getmtime(resolved_path))
+            
             logger.info(f"Loaded {len(self.zip_to_state_map)} ZIP codes from {file_path}")
         except Exception as e:
             logger.error(f"Error loading CSV file {file_path}: {str(e)}")
@@ -95,21 +316,10 @@ class ZipCodeMapper:
         Create an initial ZIP code to state mapping with common ranges.
         This is a fallback if no database file is available.
         """
-        # Define ZIP code ranges for states (simplified)
-        state_ranges = {
-            'AL': (35000, 36999),
-            'AK': (99500, 99999),
-            'AZ': (85000, 86999),
-            'AR': (71600, 72999),
-            # Add more states as needed
-            'WA': (98000, 99499),
-            # ... other states ...
-        }
-        
-        # Create mapping based on ranges
-        for state, (start, end) in state_ranges.items():
-            for zip_code in range(start, end + 1):
-                self.zip_to_state_map[str(zip_code)] = state
+        # The range table is built once at import and shared by all instances
+        self._range_starts = _RANGE_STARTS
+        self._range_ends = _RANGE_ENDS
+        self._range_states = _RANGE_STATES
         
         logger.info("Created initial ZIP code mapping with basic ranges")
 
@@ -140,10 +350,16 @@ class ZipCodeMapper:
         Returns:
             bool: True if the string is a valid ZIP code format, False otherwise
         """
-        # Basic format validation (5 digits, or 5 digits + dash + 4 digits)
-        zip_pattern = r'^\d{5}(?:-\d{4})?$'
-        
-        if not re.match(zip_pattern, zip_code):
+        # Basic format validation (5 digits, or 5 digits + dash + 4 digits).
+        # isdecimal() accepts exactly the characters the regex \d does.
+        length = len(zip_code)
+        if length == 5:
+            if not zip_code.isdecimal():
+                return False
+        elif length == 10 and zip_code[5] == '-':
+            if not (zip_code[:5].isdecimal() and zip_code[6:].isdecimal()):
+                return False
+        else:
             return False
             
         # For simplicity, we'll just check if it's in our database or in a valid range
@@ -182,7 +398,33 @@ class ZipCodeMapper:
         # Handle ZIP+4 format by extracting the base ZIP
         base_zip = zip_code.split('-')[0]
         
-        return self.zip_to_state_map.get(base_zip)
+        # Entries loaded from the database take precedence over the fallback ranges
+        state = self.zip_to_state_map.get(base_zip)
+        if state is None and self._range_starts:
+            state = self._get_state_for_range(base_zip)
+        
+        return state
+    
+    def _get_state_for_range(self, base_zip: str) -> Optional[str]:
+        """
+        Look up a 5-digit ZIP code in the fallback ZIP ranges.
+        
+        Args:
+            base_zip: 5-digit ZIP code
+            
+        Returns:
+            str or None: Two-letter state abbreviation, or None if no range contains it
+        """
+        # isdigit() alone accepts characters such as '²' that int() rejects
+        if len(base_zip) != 5 or not (base_zip.isascii() and base_zip.isdigit()):
+            return None
+        
+        zip_num = int(base_zip)
+        index = bisect.bisect_right(self._range_starts, zip_num) - 1
+        
+        if index >= 0 and zip_num <= self._range_ends[index]:
+            return self._range_states[index]
+        return None
     
     def process_zip_codes(self, zip_codes: Union[str, List[str]]) -> Dict[str, List[str]]:
         """
@@ -198,121 +440,155 @@ class ZipCodeMapper:
         if isinstance(zip_codes, str):
             # Extract all potential ZIP codes using regex
             # This finds all 5-digit sequences that might be ZIP codes
-            zip_list = re.findall(r'\b\d{5}(?:-\d{4})?\b', zip_codes)
+            zip_list = _ZIP_FINDALL.findall(zip_codes)
         else:
             zip_list = zip_codes
             
         # If no ZIP codes found, try alternate parsing
         if not zip_list and isinstance(zip_codes, str):
             # Try splitting by common separators and filtering
-            potential_zips = re.split(r'[,;\s\n]+', zip_codes)
-            zip_list = [z.strip() for z in potential_zips if z.strip() and z.strip().isdigit()]
+            # The separators include whitespace, so the pieces need no stripping
+            potential_zips = _SEP_SPLIT.split(zip_codes)
+            zip_list = [z for z in potential_zips if z.isdigit()]
             
-        result: Dict[str, List[str]] = {}
+        result: Dict[str, List[str]] = defaultdict(list)
         invalid_zips: List[str] = []
         
         # Process each ZIP code
         for zip_code in zip_list:
             # Validate ZIP code format
             if not self.validate_zip_code(zip_code):
-                logger.warning(f"Invalid ZIP code format: {zip_code}")
+                logger.warning("Invalid ZIP code format: %s", zip_code)
                 invalid_zips.append(zip_code)
                 continue
                 
             # Get state for ZIP code
             state = self.get_state_for_zip(zip_code)
             if state:
-                if state not in result:
-                    result[state] = []
                 result[state].append(zip_code)
             else:
-                logger.warning(f"Could not determine state for ZIP code: {zip_code}")
+                logger.warning("Could not determine state for ZIP code: %s", zip_code)
                 invalid_zips.append(zip_code)
         
-        if invalid_zips:
-            logger.warning(f"Unprocessed ZIP codes: {', '.join(invalid_zips)}")
+        # Only build the joined list when the warning will actually be emitted
+        if invalid_zips and logger.isEnabledFor(logging.WARNING):
+            logger.warning("Unprocessed ZIP codes: %s", ', '.join(invalid_zips))
             
-        return result
+        return dict(result)
+
+    def process_zip_codes_bulk(self, zip_codes: Iterable[str]) -> Tuple["np.ndarray", "np.ndarray"]:
+        """
+        Look up states for a whole column of ZIP codes at once.
+        
+        Validation and range lookup are vectorized with NumPy, which makes this
+        much faster than process_zip_codes for large vendor files. Only ASCII
+        digits are accepted.
+        
+        Args:
+            zip_codes: ZIP codes in 5-digit or ZIP+4 format (list, NumPy array or any iterable)
+        
+        Returns:
+            Tuple of (zip_array, state_array). state_array is an object array holding
+            the two-letter state abbreviation for each ZIP code, or None if the ZIP
+            code is invalid or its state could not be determined.
+        """
+        import numpy as np
+        
+        # np.asarray would turn a generator or set into a single element, so materialize it first
+        if not isinstance(zip_codes, (Sequence, np.ndarray)):
+            zip_codes = list(zip_codes)
+        
+        zips = np.asarray(zip_codes, dtype=str).ravel()
+        states = np.full(zips.shape, None, dtype=object)
+        if zips.size == 0:
+            return zips, states
+        
+        # View each ZIP as 10 UCS-4 code points (ZIP+4 length); longer strings are rejected below
+        lengths = np.char.str_len(zips)
+        codes = zips.astype('<U10').view(np.uint32).reshape(-1, 10)
+        is_digit = (codes >= ord('0')) & (codes <= ord('9'))
+        
+        valid = is_digit[:, :5].all(axis=1) & (
+            (lengths == 5)
+            | ((lengths == 10) & (codes[:, 5] == ord('-')) & is_digit[:, 6:].all(axis=1))
+        )
+        
+        # Turn the first five code points into integers
+        weights = np.array([10000, 1000, 100, 10, 1], dtype=np.int64)
+        ints = (codes[:, :5].astype(np.int64) - ord('0')) @ weights
+        
+        if self._range_starts:
+            starts = np.frombuffer(self._range_starts, dtype=np.uint32)
+            ends = np.frombuffer(self._range_ends, dtype=np.uint32)
+            range_states = np.array(self._range_states, dtype=object)
+        
+            index = np.searchsorted(starts, ints, side='right') - 1
+            clipped = np.maximum(index, 0)
+            in_range = valid & (index >= 0) & (ints <= ends[clipped])
+            states[in_range] = range_states[clipped[in_range]]
+        
+        # Entries loaded from the database take precedence over the fallback ranges
+        if self.zip_to_state_map:
+            valid_positions = np.flatnonzero(valid)
+            base_zips = zips[valid_positions].astype('<U5').tolist()
+            lookup = self.zip_to_state_map.get
+            for position, base_zip in zip(valid_positions.tolist(), base_zips):
+                state = lookup(base_zip)
+                if state is not None:
+                    states[position] = state
+        
+        return zips, states
 
-    def states_to_urls(self, states: Set[str], base_url: str = "https://potadvisor.com") -> Dict[str, Tuple[str, str]]:
+    def states_to_urls(self, states: Iterable[str], base_url: str = _DEFAULT_BASE_URL) -> Dict[str, Tuple[str, str]]:
         """
         Convert state abbreviations to PotAdvisor URLs.
         
         Args:
-            states: Set of state abbreviations
+            states: State abbreviations (any iterable, e.g. a dict keys view)
             base_url: Base URL for PotAdvisor state pages
             
         Returns:
             Dict mapping state abbreviations to tuples of (url, state_name)
         """
-        state_names = {
-            'AL': 'alabama',
-            'AK': 'alaska',
-            'AZ': 'arizona',
-            'AR': 'arkansas',
-            'CA': 'california',
-            'CO': 'colorado',
-            'CT': 'connecticut',
-            'DE': 'delaware',
-            'FL': 'florida',
-            'GA': 'georgia',
-            'HI': 'hawaii',
-            'ID': 'idaho',
-            'IL': 'illinois',
-            'IN': 'indiana',
-            'IA': 'iowa',
-            'KS': 'kansas',
-            'KY': 'kentucky',
-            'LA': 'louisiana',
-            'ME': 'maine',
-            'MD': 'maryland',
-            'MA': 'massachusetts',
-            'MI': 'michigan',
-            'MN': 'minnesota',
-            'MS': 'mississippi',
-            'MO': 'missouri',
-            'MT': 'montana',
-            'NE': 'nebraska',
-            'NV': 'nevada',
-            'NH': 'new-hampshire',
-            'NJ': 'new-jersey',
-            'NM': 'new-mexico',
-            'NY': 'new-york',
-            'NC': 'north-carolina',
-            'ND': 'north-dakota',
-            'OH': 'ohio',
-            'OK': 'oklahoma',
-            'OR': 'oregon',
-            'PA': 'pennsylvania',
-            'RI': 'rhode-island',
-            'SC': 'south-carolina',
-            'SD': 'south-dakota',
-            'TN': 'tennessee',
-            'TX': 'texas',
-            'UT': 'utah',
-            'VT': 'vermont',
-            'VA': 'virginia',
-            'WA': 'washington',
-            'WV': 'west-virginia',
-            'WI': 'wisconsin',
-            'WY': 'wyoming',
-            'DC': 'district-of-columbia'
-        }
+        # URLs for the default base URL are precomputed at import
+        default_urls = _DEFAULT_URLS if base_url == _DEFAULT_BASE_URL else None
         
         urls = {}
         for state in states:
-            if state in state_names:
-                state_name = state_names[state]
-                
-                # From screenshot we can see the actual URLs are in this format
-                url = f"{base_url}/states/{state_name}/{state_name}-dispensaries/"
-                
-                urls[state] = (url, state_name)
-            else:
+            state_name = _STATE_NAMES.get(state)
+            if state_name is None:
                 logger.warning(f"No URL mapping available for state: {state}")
+            elif default_urls is not None:
+                urls[state] = default_urls[state]
+            else:
+                urls[state] = (_state_url(base_url, state_name), state_name)
         
         return urls
 
+@functools.lru_cache(maxsize=None)
+def _shared_zip_mapper(zip_database_path: Optional[str]) -> ZipCodeMapper:
+    """Create the shared mapper for an already normalized database path."""
+    return ZipCodeMapper(zip_database_path)
+
+def get_zip_mapper(zip_database_path: Optional[str] = None) -> ZipCodeMapper:
+    """
+    Get a shared ZipCodeMapper for the given database path.
+    
+    The mapper is created on first use and reused by later callers, so the ZIP
+    database is only loaded once per process. Paths are resolved first, so every
+    spelling of the same file shares one mapper. Sharing is thread safe because a
+    mapper is never modified after it has been initialized.
+    
+    Args:
+        zip_database_path: Path to the ZIP code database CSV file, or None for the default
+        
+    Returns:
+        ZipCodeMapper: The shared mapper for that path
+    """
+    if zip_database_path is not None:
+        zip_database_path = str(Path(zip_database_path).resolve())
+    return _shared_zip_mapper(zip_database_path)
+
 # Example usage
 if __name__ == "__main__":
     # Configure logging
@@ -322,7 +598,7 @@ if __name__ == "__main__":
     )
     
     # Test the mapper
-    mapper = ZipCodeMapper()
+    mapper = get_zip_mapper()
     
     # Process some ZIP codes
     test_zips = "99501, 98101, 97201, 90210"
@@ -333,7 +609,7 @@ if __name__ == "__main__":
         print(f"{state}: {', '.join(zips)}")
     
     # Generate URLs
-    urls = mapper.states_to_urls(set(state_groups.keys()))
+    urls = mapper.states_to_urls(state_groups.keys())
     
     print("\nPotAdvisor URLs:")
     for state, url in urls.items():
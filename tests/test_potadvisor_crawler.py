@@ -0,0 +1,240 @@
+import asyncio
+import json
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+from crawl4ai import CacheMode
+from src.scrapers.crawl4ai_integration import potadvisor_crawler
+from src.scrapers.crawl4ai_integration.potadvisor_crawler import (
+    PotAdvisorCrawler, _extract_zip, _normalize_url, ndjson_to_json
+)
+
+LISTING_URL = "https://potadvisor.com/states/alaska/alaska-dispensaries/"
+
+class FakeCrawler:
+    """Stand-in for AsyncWebCrawler serving canned extracted content per URL."""
+
+    def __init__(self, pages, fetch_times=None):
+        self.pages = pages
+        self.fetch_times = fetch_times or {}
+        self.calls = []
+        self.start_times = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def arun(self, url, config=None):
+        self.calls.append(url)
+        self.start_times[url] = time.monotonic()
+        await asyncio.sleep(self.fetch_times.get(url, 0.0))
+        content = self.pages.get(url)
+        if content is None:
+            return SimpleNamespace(success=False, extracted_content=None, error="404")
+        return SimpleNamespace(success=True, extracted_content=content, error=None)
+
+@pytest.fixture
+def potadvisor(tmp_path):
+    return PotAdvisorCrawler(output_dir=str(tmp_path / "out"), cache_dir=None)
+
+@pytest.fixture
+def cached_potadvisor(tmp_path):
+    return PotAdvisorCrawler(output_dir=str(tmp_path / "out"), cache_dir=str(tmp_path / "cache"))
+
+def crawl(potadvisor, fake, filter_zip_codes=frozenset()):
+    return asyncio.run(potadvisor.crawl_state(
+        "AK", "alaska", LISTING_URL, filter_zip_codes, fake
+    ))
+
+@pytest.mark.parametrize("address, expected", [
+    ("123 Main St, Anchorage, AK 99501", "99501"),
+    ("123 Main St, Anchorage, AK 99501-1234  ", "99501-1234"),
+    # The trailing ZIP wins over a 5-digit street number
+    ("12345 Old Rd, AK 99501", "99501"),
+    ("99501", "99501"),
+    # Regex fallback when the address does not end in a ZIP
+    ("Anchorage, AK 99501 USA", "99501"),
+    ("AK99501", None),
+    ("Suite 12, AK", None),
+])
+def test_extract_zip(address, expected):
+    assert _extract_zip(address) == expected
+
+def test_normalize_url():
+    assert _normalize_url("HTTPS://PotAdvisor.com/directory/a/#reviews") == "https://potadvisor.com/directory/a"
+    assert _normalize_url("https://potadvisor.com/directory/a?page=2") == "https://potadvisor.com/directory/a?page=2"
+
+def test_crawl_state_resolves_and_dedups_detail_urls(potadvisor):
+    listings = [
+        {"name": "A", "address": "1 Main St, AK 99501", "url": "/directory/a/"},
+        {"name": "B", "address": "2 Main St, AK 99502", "url": "//potadvisor.com/directory/b/"},
+        {"name": "A2", "address": "3 Main St, AK 99501", "url": "https://PotAdvisor.com/directory/a#reviews"},
+        {"name": "C", "address": "4 Main St, AK 99503", "url": "/directory/missing/"},
+        {"name": "D", "address": "5 Main St, AK 99504"},
+    ]
+    fake = FakeCrawler({
+        LISTING_URL: json.dumps(listings),
+        "https://potadvisor.com/directory/a/": json.dumps([{"phone": "555-0001"}]),
+        "https://potadvisor.com/directory/b/": json.dumps([{"phone": "555-0002"}]),
+    })
+
+    dispensaries = crawl(potadvisor, fake)
+
+    # Each unique detail page is fetched once, including the failed one
+    assert sorted(fake.calls) == sorted([
+        LISTING_URL,
+        "https://potadvisor.com/directory/a/",
+        "https://potadvisor.com/directory/b/",
+        "https://potadvisor.com/directory/missing/",
+    ])
+    assert [d["name"] for d in dispensaries] == ["A", "B", "A2", "C", "D"]
+    assert [d.get("phone") for d in dispensaries] == ["555-0001", "555-0002", "555-0001", None, None]
+    # A failed detail page falls back to the bare listing
+    assert dispensaries[3] == {**listings[3], "zip_code": "99503"}
+
+def test_malformed_detail_falls_back_to_listing(potadvisor):
+    listings = [
+        {"name": "A", "address": "1 Main St, AK 99501", "url": "/directory/a/"},
+        {"name": "B", "address": "2 Main St, AK 99502", "url": "/directory/b/"},
+    ]
+    fake = FakeCrawler({
+        LISTING_URL: json.dumps(listings),
+        "https://potadvisor.com/directory/a/": json.dumps(["oops"]),
+        "https://potadvisor.com/directory/b/": json.dumps([{"phone": "555-0002"}]),
+    })
+
+    dispensaries = crawl(potadvisor, fake)
+
+    assert dispensaries == [
+        {**listings[0], "zip_code": "99501"},
+        {**listings[1], "zip_code": "99502", "phone": "555-0002"},
+    ]
+
+def test_crawl_state_filters_by_zip(potadvisor):
+    listings = [
+        {"name": "A", "address": "1 Main St, AK 99501"},
+        {"name": "B", "address": "2 Main St, AK 99502"},
+    ]
+    fake = FakeCrawler({LISTING_URL: json.dumps(listings)})
+    assert [d["name"] for d in crawl(potadvisor, fake, frozenset({"99502"}))] == ["B"]
+
+def test_ndjson_to_json(tmp_path):
+    ndjson_file = tmp_path / "alaska_dispensaries.ndjson"
+    ndjson_file.write_text('{"name":"A"}\n\n{"name":"B","zip_code":"99501"}\n', encoding="utf-8")
+
+    json_file = ndjson_to_json(str(ndjson_file))
+
+    assert json_file == str(tmp_path / "alaska_dispensaries.json")
+    with open(json_file, encoding="utf-8") as f:
+        assert json.load(f) == [{"name": "A"}, {"name": "B", "zip_code": "99501"}]
+
+def test_cache_serves_fresh_entries(cached_potadvisor):
+    fake = FakeCrawler({LISTING_URL: json.dumps([{"name": "A", "address": "1 Main St, AK 99501"}])})
+    assert crawl(cached_potadvisor, fake) == crawl(cached_potadvisor, fake)
+    assert fake.calls == [LISTING_URL]
+
+def test_stale_cache_entry_is_fetched_past_crawl4ai_cache(cached_potadvisor, potadvisor):
+    cached_potadvisor.cache_ttl = 0
+    fake = FakeCrawler({LISTING_URL: json.dumps([{"name": "A", "address": "1 Main St, AK 99501"}])})
+    crawl(cached_potadvisor, fake)
+    crawl(cached_potadvisor, fake)
+    assert fake.calls == [LISTING_URL, LISTING_URL]
+    # The page cache owns freshness; crawl4ai's cache is only used without it
+    assert cached_potadvisor._listing_config.cache_mode == CacheMode.BYPASS
+    assert cached_potadvisor._detail_config.cache_mode == CacheMode.BYPASS
+    assert potadvisor._listing_config.cache_mode == CacheMode.ENABLED
+
+def test_corrupt_cache_entry_is_recrawled(cached_potadvisor, tmp_path):
+    content = json.dumps([{"name": "A", "address": "1 Main St, AK 99501"}])
+    fake = FakeCrawler({LISTING_URL: content})
+    crawl(cached_potadvisor, fake)
+
+    # Simulate a process killed mid-write of the cache entry
+    (cache_file,) = (tmp_path / "cache").iterdir()
+    cache_file.write_text(content[:20], encoding="utf-8")
+
+    assert [d["name"] for d in crawl(cached_potadvisor, fake)] == ["A"]
+    assert fake.calls == [LISTING_URL, LISTING_URL]
+    assert cache_file.read_text(encoding="utf-8") == content
+
+def test_invalid_json_is_not_cached(cached_potadvisor, tmp_path):
+    fake = FakeCrawler({LISTING_URL: "[{"})
+    assert crawl(cached_potadvisor, fake) == []
+    assert list((tmp_path / "cache").iterdir()) == []
+
+def test_per_domain_delay_holds_when_requests_queue(tmp_path):
+    potadvisor = PotAdvisorCrawler(
+        output_dir=str(tmp_path / "out"), cache_dir=None, max_requests=2, per_domain_delay=0.2
+    )
+    urls = [f"https://potadvisor.com/directory/d{i}/" for i in range(5)]
+    fetch_times = dict(zip(urls, (1.0, 0.81, 0.3, 0.0, 0.0)))
+    fake = FakeCrawler({url: "[]" for url in urls}, fetch_times)
+
+    async def run_all():
+        await asyncio.gather(*(potadvisor._throttled_arun(fake, url, None) for url in urls))
+
+    asyncio.run(run_all())
+    starts = sorted(fake.start_times.values())
+    gaps = [later - earlier for earlier, later in zip(starts, starts[1:])]
+    assert min(gaps) >= 0.19
+
+def test_crawler_reused_across_event_loops(tmp_path):
+    potadvisor = PotAdvisorCrawler(
+        output_dir=str(tmp_path / "out"), cache_dir=None, max_requests=1, per_domain_delay=0.01
+    )
+    urls = [f"https://potadvisor.com/directory/d{i}/" for i in range(3)]
+    fake = FakeCrawler({url: "[]" for url in urls}, dict.fromkeys(urls, 0.01))
+
+    async def run_all():
+        await asyncio.gather(*(potadvisor._throttled_arun(fake, url, None) for url in urls))
+
+    # Each asyncio.run() starts a new loop; the request limits must not stay bound to the first
+    asyncio.run(run_all())
+    asyncio.run(run_all())
+    assert len(fake.calls) == 6
+
+def read_output(path):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        return pq.read_table(path).to_pylist()
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".ndjson"):
+            return [json.loads(line) for line in f]
+        return json.load(f)
+
+@pytest.mark.parametrize("options, suffix", [
+    ({}, ".json"),
+    ({"stream_ndjson": True}, ".ndjson"),
+    ({"export_parquet": True}, ".parquet"),
+])
+def test_crawl_and_save_output_formats(tmp_path, monkeypatch, options, suffix):
+    if options.get("export_parquet"):
+        pytest.importorskip("pyarrow")
+    empty_url = "https://potadvisor.com/states/washington/washington-dispensaries/"
+    fake = FakeCrawler({
+        LISTING_URL: json.dumps([
+            {"name": "A", "address": "1 Main St, AK 99501"},
+            {"name": "B", "address": "2 Main St, AK 99502"},
+        ]),
+        empty_url: "[]",
+    })
+    monkeypatch.setattr(potadvisor_crawler, "AsyncWebCrawler", lambda config=None: fake)
+    out_dir = tmp_path / "out"
+    potadvisor = PotAdvisorCrawler(output_dir=str(out_dir), cache_dir=None, **options)
+
+    output_files = asyncio.run(potadvisor.crawl_and_save(
+        {"AK": (LISTING_URL, "alaska"), "WA": (empty_url, "washington")}, {}
+    ))
+
+    assert output_files == {"AK": str(out_dir / f"alaska_dispensaries{suffix}")}
+    assert [record["name"] for record in read_output(output_files["AK"])] == ["A", "B"]
+    # Nothing is left behind for the state without results
+    assert [path.name for path in out_dir.iterdir()] == [f"alaska_dispensaries{suffix}"]
+    # Every format gets the permissions the umask allows, like any other file
+    umask = os.umask(0)
+    os.umask(umask)
+    assert os.stat(output_files["AK"]).st_mode & 0o777 == 0o666 & ~umask
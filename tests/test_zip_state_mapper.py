@@ -0,0 +1,168 @@
+import os
+import pytest
+from src.vendor_intake.utils import zip_state_mapper
+from src.vendor_intake.utils.zip_state_mapper import ZipCodeMapper, _read_zip_cache, get_zip_mapper
+
+@pytest.fixture
+def mapper():
+    return ZipCodeMapper()
+
+def write_db(tmp_path, text):
+    """Write a ZIP code database CSV into tmp_path and return its path."""
+    db_path = tmp_path / "zip_code_database.csv"
+    db_path.write_text(text, encoding="utf-8")
+    return db_path
+
+@pytest.fixture
+def csv_mapper(tmp_path):
+    db_path = write_db(tmp_path, "zip_code,state\n97201,OR\n99501,AK\n")
+    return ZipCodeMapper(str(db_path))
+
+def test_get_state_for_zip_uses_fallback_ranges(mapper):
+    assert mapper.get_state_for_zip("99501") == "AK"
+    assert mapper.get_state_for_zip("99501-1234") == "AK"
+    assert mapper.get_state_for_zip("98101") == "WA"
+    # Range boundaries are inclusive
+    assert mapper.get_state_for_zip("35000") == "AL"
+    assert mapper.get_state_for_zip("36999") == "AL"
+
+def test_get_state_for_zip_outside_ranges(mapper):
+    assert mapper.get_state_for_zip("90210") is None
+    assert mapper.get_state_for_zip("00001") is None
+    assert mapper.get_state_for_zip("9950") is None
+    assert mapper.get_state_for_zip("9950\u00b2") is None
+    assert mapper.get_state_for_zip("\u0669\u0669\u0665\u0660\u0661") is None
+
+def test_get_state_for_zip_from_csv(csv_mapper):
+    assert csv_mapper.get_state_for_zip("97201") == "OR"
+    assert csv_mapper.get_state_for_zip("99501-1234") == "AK"
+    assert csv_mapper.get_state_for_zip("98101") is None
+
+def test_process_zip_codes_groups_by_state(mapper):
+    result = mapper.process_zip_codes("99501, 98101 99502\n90210")
+    assert result == {"AK": ["99501", "99502"], "WA": ["98101"]}
+
+def test_states_to_urls(mapper):
+    urls = mapper.states_to_urls(["AK", "XX"])
+    assert urls == {
+        "AK": ("https://potadvisor.com/states/alaska/alaska-dispensaries/", "alaska")
+    }
+
+def test_validate_zip_code(mapper):
+    assert mapper.validate_zip_code("99501")
+    assert mapper.validate_zip_code("99501-1234")
+    assert not mapper.validate_zip_code("9950")
+    assert not mapper.validate_zip_code("99501-12")
+    assert not mapper.validate_zip_code("99501 ")
+    assert not mapper.validate_zip_code("00000")
+
+def test_process_zip_codes_bulk_matches_scalar_lookup(csv_mapper, mapper):
+    zips = ["99501", "99501-1234", "97201", "98101", "9950", "abcde", "99501-12", ""]
+    for zip_mapper in (mapper, csv_mapper):
+        zip_array, state_array = zip_mapper.process_zip_codes_bulk(zips)
+        assert zip_array.tolist() == zips
+        expected = [
+            zip_mapper.get_state_for_zip(z) if zip_mapper.validate_zip_code(z) else None
+            for z in zips
+        ]
+        assert state_array.tolist() == expected
+
+def test_process_zip_codes_bulk_accepts_generators(mapper):
+    zip_array, state_array = mapper.process_zip_codes_bulk(z for z in ["99501", "98101"])
+    assert zip_array.tolist() == ["99501", "98101"]
+    assert state_array.tolist() == ["AK", "WA"]
+
+def test_process_zip_codes_bulk_empty(mapper):
+    zip_array, state_array = mapper.process_zip_codes_bulk([])
+    assert zip_array.size == 0 and state_array.size == 0
+
+def test_csv_mapping_shared_between_instances(tmp_path):
+    db_path = write_db(tmp_path, "zip_code,state\n97201,OR\n")
+    first = ZipCodeMapper(str(db_path))
+    second = ZipCodeMapper(str(db_path))
+    assert first.zip_to_state_map is second.zip_to_state_map
+    with pytest.raises(TypeError):
+        first.zip_to_state_map["98101"] = "WA"
+
+def test_csv_mapping_reloaded_when_file_changes(tmp_path):
+    db_path = write_db(tmp_path, "zip_code,state\n97201,OR\n")
+    assert ZipCodeMapper(str(db_path)).get_state_for_zip("98101") is None
+    db_path.write_text("zip_code,state\n97201,OR\n98101,WA\n", encoding="utf-8")
+    mtime = db_path.stat().st_mtime + 10
+    os.utime(db_path, (mtime, mtime))
+    assert ZipCodeMapper(str(db_path)).get_state_for_zip("98101") == "WA"
+
+def test_csv_alternate_column_names(tmp_path):
+    db_path = write_db(tmp_path, "city,ZIP,state_abbr\nPortland,97201,OR\n\nSeattle,98101\n,98102,WA\n")
+    mapper = ZipCodeMapper(str(db_path))
+    assert dict(mapper.zip_to_state_map) == {"97201": "OR", "98102": "WA"}
+
+def test_csv_without_known_columns(tmp_path):
+    db_path = write_db(tmp_path, "postal,region\n97201,OR\n")
+    assert len(ZipCodeMapper(str(db_path)).zip_to_state_map) == 0
+
+def test_csv_state_values_are_shared(tmp_path):
+    db_path = write_db(tmp_path, "zip_code,state\n97201,OR\n97202,OR\n98101,WA\n")
+    zip_to_state = ZipCodeMapper(str(db_path)).zip_to_state_map
+    assert zip_to_state["97201"] is zip_to_state["97202"]
+
+def test_get_zip_mapper_returns_shared_instance(tmp_path):
+    db_path = write_db(tmp_path, "zip_code,state\n97201,OR\n")
+    assert get_zip_mapper(str(db_path)) is get_zip_mapper(str(db_path))
+    assert get_zip_mapper(str(db_path)).get_state_for_zip("97201") == "OR"
+
+def test_get_zip_mapper_normalizes_path(tmp_path, monkeypatch):
+    db_path = write_db(tmp_path, "zip_code,state\n97201,OR\n")
+    monkeypatch.chdir(tmp_path)
+    assert get_zip_mapper("zip_code_database.csv") is get_zip_mapper(str(db_path))
+    assert get_zip_mapper() is get_zip_mapper(None)
+
+def test_mapper_has_no_instance_dict(mapper):
+    assert not hasattr(mapper, "__dict__")
+
+def test_process_zip_codes_logs_unprocessed(mapper, caplog):
+    with caplog.at_level("WARNING"):
+        mapper.process_zip_codes(["99501", "90210", "1234"])
+    assert "Unprocessed ZIP codes: 90210, 1234" in caplog.text
+
+def test_process_zip_codes_returns_plain_dict(mapper):
+    result = mapper.process_zip_codes(["90210"])
+    assert type(result) is dict
+    assert "AK" not in result and result == {}
+
+def test_states_to_urls_custom_base_url(mapper):
+    urls = mapper.states_to_urls({"NY": 1}.keys(), base_url="http://localhost:8000")
+    assert urls == {
+        "NY": ("http://localhost:8000/states/new-york/new-york-dispensaries/", "new-york")
+    }
+
+def test_csv_mapping_cached_for_later_loads(tmp_path):
+    db_path = write_db(tmp_path, "zip_code,state\n97201,OR\n97202,OR\n")
+    mapper = ZipCodeMapper(str(db_path))
+    cache_path = tmp_path / "zip_code_database.csv.marshal"
+    assert cache_path.exists()
+    
+    # A fresh process would skip the CSV and read the cache
+    resolved = str(db_path.resolve())
+    cached = _read_zip_cache(f"{resolved}.marshal", os.path.getmtime(resolved))
+    assert cached == dict(mapper.zip_to_state_map)
+    assert cached["97201"] is cached["97202"]
+    
+    # Any change to the CSV mtime invalidates the cache
+    assert _read_zip_cache(f"{resolved}.marshal", os.path.getmtime(resolved) - 10) is None
+
+def test_cache_from_other_parser_format_is_ignored(tmp_path, monkeypatch):
+    db_path = write_db(tmp_path, "zip_code,state\n97201,OR\n")
+    ZipCodeMapper(str(db_path))
+    resolved = str(db_path.resolve())
+    mtime = os.path.getmtime(resolved)
+    assert _read_zip_cache(f"{resolved}.marshal", mtime) == {"97201": "OR"}
+    
+    # A cache built with different column rules must not be served
+    monkeypatch.setattr(zip_state_mapper, "_ZIP_CACHE_FORMAT", "2:zip:state")
+    assert _read_zip_cache(f"{resolved}.marshal", mtime) is None
+
+def test_corrupt_cache_falls_back_to_csv(tmp_path):
+    db_path = write_db(tmp_path, "zip_code,state\n97201,OR\n")
+    (tmp_path / "zip_code_database.csv.marshal").write_bytes(b"not marshal data")
+    assert ZipCodeMapper(str(db_path)).get_state_for_zip("97201") == "OR"